@@ -1,18 +1,164 @@
-from serpapi import GoogleSearch
-from backend.config import SERPAPI_KEY
+import logging
+import os
+import threading
+import orjson
+from cachetools.keys import hashkey
+from requests import RequestException
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from backend.api.cache import ttl_cached
+from backend.api.semantic_cache import semantic_cached
+from backend.config import (
+    BASE_URL,
+    SERPAPI_KEY,
+    SERPAPI_CACHE_ENABLED,
+    SERPAPI_CACHE_PATH,
+    SERPAPI_CACHE_TTL,
+    redact_api_keys,
+)
 
-def get_product_locations(page_token: str) -> dict:
+log = logging.getLogger(__name__)
+
+# Timeout in seconds for a single SerpAPI request
+REQUEST_TIMEOUT = 30
+
+# Connections kept open to SerpAPI; also bounds concurrent async lookups
+MAX_CONNECTIONS = 20
+
+# Fields kept from each Google Shopping result (used by /search and the pipeline test);
+# everything else is dropped before the response is cached in memory
+SHOPPING_RESULT_FIELDS = (
+    "title",
+    "price",
+    "extracted_price",
+    "source",
+    "thumbnail",
+    "rating",
+    "reviews",
+    "product_id",
+    "product_link",
+    "link",
+    "immersive_product_page_token",
+)
+
+# Retry connection errors and transient HTTP errors with exponential backoff.
+# Read timeouts are not retried: SerpAPI may already have run (and billed) the
+# search, and each one already waited REQUEST_TIMEOUT seconds.
+RETRY_POLICY = Retry(
+    total=3,
+    read=0,
+    backoff_factor=0.5,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=("GET",),
+    raise_on_status=False,
+)
+
+
+def _is_cacheable(response) -> bool:
+    """Only persist responses that parsed and carry no SerpAPI error"""
+    try:
+        return "error" not in orjson.loads(response.content)
+    except ValueError:
+        return False
+
+
+def _create_session():
+    """
+    Build the HTTP session used for every SerpAPI call.
+    Responses are persisted to SQLite so they survive process restarts; the
+    api_key and no_cache query parameters are excluded from cache keys, and
+    api_key from stored responses.
+    """
+    import requests_cache
+
+    if not SERPAPI_CACHE_ENABLED:
+        session = requests_cache.CachedSession(backend="memory", expire_after=requests_cache.DO_NOT_CACHE)
+    else:
+        session = requests_cache.CachedSession(
+            SERPAPI_CACHE_PATH,
+            backend="sqlite",
+            expire_after=SERPAPI_CACHE_TTL,
+            allowable_methods=("GET",),
+            filter_fn=_is_cacheable,
+            ignored_parameters=(*requests_cache.DEFAULT_IGNORED_PARAMS, "no_cache"),
+        )
+
+    session.mount("https://", HTTPAdapter(pool_maxsize=MAX_CONNECTIONS, max_retries=RETRY_POLICY))
+    return session
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _get_session():
+    """Return the shared SerpAPI session, creating it on first use"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = _create_session()
+    return _session
+
+
+def _reset_session_after_fork():
+    """Forked workers get their own session instead of the parent's sockets and SQLite connection"""
+    global _session, _session_lock
+    _session = None
+    _session_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_session_after_fork)
+
+
+def _search(params: dict, force_refresh: bool = False, no_cache: bool = False) -> dict:
+    """
+    Send a search request to SerpAPI and return the decoded JSON response.
+
+    Args:
+        params (dict): SerpAPI query parameters.
+        force_refresh (bool): Skip the on-disk cache and overwrite it with a fresh response.
+        no_cache (bool): Neither read from nor write to the on-disk cache.
+    Returns:
+        dict: The decoded SerpAPI response.
+    """
+    from requests_cache import DO_NOT_CACHE
+
+    # Fresh data must not come from SerpAPI's own one-hour search cache either
+    if force_refresh or no_cache:
+        params = {**params, "no_cache": "true"}
+
+    try:
+        response = _get_session().get(
+            BASE_URL,
+            params=params,
+            timeout=REQUEST_TIMEOUT,
+            force_refresh=force_refresh,
+            expire_after=DO_NOT_CACHE if no_cache else None,
+        )
+    except RequestException as e:
+        # The message embeds the request URL, api_key included, and callers log or return it
+        raise type(e)(redact_api_keys(str(e))) from None
+    return orjson.loads(response.content)
+
+
+@ttl_cached(lambda page_token, **_: hashkey("google_immersive_product", page_token))
+def get_product_locations(page_token: str, *, force_refresh: bool = False, no_cache: bool = False) -> dict:
     """
     Query Google Immersive Product API via SerpAPI for location/availability data.
     Uses an immersive product page token to get detailed product info including stores.
+    Successful responses are cached in memory and on disk per page token.
 
     Note: Using Google Immersive Product API as Google Product API was discontinued.
     The page_token comes from the 'immersive_product_page_token' field in shopping results.
 
     Args:
         page_token (str): The immersive product page token from shopping results.
+        force_refresh (bool, optional): Bypass cached responses and fetch fresh data. Defaults to False.
+        no_cache (bool, optional): Neither read from nor write to any cache. Defaults to False.
     Returns:
-        dict: A dictionary containing product location/availability results.
+        dict: {"product_results": ...} with the product and its stores, {"error": ...}
+            on a SerpAPI error, or {} when the response has no product data.
     """
 
     # Define search parameters for Google Immersive Product API
@@ -23,30 +169,38 @@ def get_product_locations(page_token: str) -> dict:
     }
 
     # Perform the search and get results
-    search = GoogleSearch(params)
-    data = search.get_dict()
+    data = _search(params, force_refresh=force_refresh, no_cache=no_cache)
 
     # Return relevant data
     if "error" in data:
-        print("Error:", data["error"])
+        log.warning("SerpAPI error: %s", data["error"])
         return {"error": data["error"]}
 
-    # Print available keys for debugging
-    print("Available response keys:", list(data.keys()))
+    log.debug("Available response keys: %s", data.keys())
 
-    # Return the full response for now to see what's available
-    return data
+    # Search metadata and other top-level sections are not used
+    if "product_results" not in data:
+        return {}
+    return {"product_results": data["product_results"]}
 
-def get_product_results(query: str, user_location: str = None) -> dict:
+@ttl_cached(lambda query, user_location=None, **_: hashkey("google_shopping", query, user_location))
+@semantic_cached(lambda query, user_location=None, **_: f"google_shopping|us|en|{user_location or ''}")
+def get_product_results(query: str, user_location: str = None, *, force_refresh: bool = False,
+                        no_cache: bool = False) -> dict:
     """
     Query Google Shopping via SerpAPI for a given product name.
     Returns structured shopping results including title, price, and source.
-    
+    Successful responses are cached in memory and on disk per (query, user_location);
+    near-duplicate queries can also be served by the opt-in semantic cache.
+
     Args:
         query (str): The product name to search for.
         user_location (str, optional): The location to tailor search results. Defaults to None.
+        force_refresh (bool, optional): Bypass cached responses and fetch fresh data. Defaults to False.
+        no_cache (bool, optional): Neither read from nor write to any cache. Defaults to False.
     Returns:
-        dict: A dictionary containing shopping results.
+        dict: {"shopping_results": [...]} with each result narrowed to SHOPPING_RESULT_FIELDS,
+            or {} when nothing was found.
     """
 
     # Define search parameters
@@ -63,14 +217,16 @@ def get_product_results(query: str, user_location: str = None) -> dict:
         params["location"] = user_location
 
     # Perform the search and get results
-    search = GoogleSearch(params)
-    data = search.get_dict()
+    data = _search(params, force_refresh=force_refresh, no_cache=no_cache)
 
     if "shopping_results" in data:
-        return {"shopping_results": data["shopping_results"]}
+        return {"shopping_results": [
+            {field: result[field] for field in SHOPPING_RESULT_FIELDS if field in result}
+            for result in data["shopping_results"]
+        ]}
     else:
-        print("No shopping results found.")
-        print("Full response keys:", list(data.keys()))
         if "error" in data:
-            print("Error:", data["error"])
+            log.warning("SerpAPI error: %s", data["error"])
+        else:
+            log.info("No shopping results found for %r (response keys: %s)", query, data.keys())
         return {}
@@ -0,0 +1,34 @@
+"""
+Async interface to the SerpAPI client
+Lets callers fan out several lookups with asyncio.gather while sharing the
+sync client's caches, connection pool and retry policy
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from backend.api.api_retrieval import MAX_CONNECTIONS, get_product_locations, get_product_results
+
+# One worker per pooled connection; the HTTP calls release the GIL
+_executor = ThreadPoolExecutor(max_workers=MAX_CONNECTIONS, thread_name_prefix="serpapi")
+
+
+async def _run(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, partial(func, *args, **kwargs))
+
+
+async def aget_product_results(query: str, user_location: str = None, **kwargs) -> dict:
+    """
+    Async variant of get_product_results; accepts the same arguments.
+
+    Example:
+        results = await asyncio.gather(*(aget_product_results(q) for q in queries))
+    """
+    return await _run(get_product_results, query, user_location, **kwargs)
+
+
+async def aget_product_locations(page_token: str, **kwargs) -> dict:
+    """Async variant of get_product_locations; accepts the same arguments"""
+    return await _run(get_product_locations, page_token, **kwargs)
@@ -0,0 +1,113 @@
+"""
+In-process TTL cache for SerpAPI lookups
+Memoizes successful responses so repeated queries skip the network round-trip
+and do not spend additional API credits
+"""
+
+import os
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from functools import wraps
+
+from cachetools import TTLCache
+
+from backend.config import SERPAPI_CACHE_ENABLED, SERPAPI_CACHE_MAXSIZE, SERPAPI_CACHE_TTL
+
+# Shared by every cached client function; keys are namespaced per engine
+_cache = TTLCache(maxsize=SERPAPI_CACHE_MAXSIZE, ttl=SERPAPI_CACHE_TTL)
+_lock = threading.RLock()
+# Lookups currently being fetched, so concurrent identical calls share one request
+_in_flight = {}
+# Seconds a caller waits on another thread's in-flight lookup before sending its
+# own request; a little over the SerpAPI client's 30s read timeout
+IN_FLIGHT_WAIT = 35
+
+
+def _reset_after_fork():
+    """A forked worker must not wait on the parent's in-flight lookups or inherit a held lock"""
+    global _lock, _in_flight
+    _lock = threading.RLock()
+    _in_flight = {}
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def ttl_cached(key_func):
+    """
+    Decorator that caches a SerpAPI client function's response for SERPAPI_CACHE_TTL seconds
+
+    Error and empty responses are returned without being stored so that a
+    transient failure is retried on the next call. Concurrent calls with the
+    same key while a lookup is in flight wait for it (up to IN_FLIGHT_WAIT
+    seconds) instead of sending their own request. Each caller gets its own
+    shallow copy of the response; nested lists and dicts are shared with the
+    cache and must be treated as read-only. Calling the wrapped function with force_refresh=True skips
+    the lookup and replaces the cached entry; no_cache=True bypasses the cache
+    entirely.
+
+    Args:
+        key_func: Callable taking the wrapped function's arguments and returning
+            a hashable cache key (see cachetools.keys.hashkey).
+    Returns:
+        The decorator to apply to the client function.
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not SERPAPI_CACHE_ENABLED or kwargs.get("no_cache"):
+                return func(*args, **kwargs)
+
+            key = key_func(*args, **kwargs)
+            if kwargs.get("force_refresh"):
+                return dict(_fetch(func, key, args, kwargs))
+
+            with _lock:
+                data = _cache.get(key)
+                if data is not None:
+                    return dict(data)
+                pending = _in_flight.get(key)
+                if pending is None:
+                    _in_flight[key] = future = Future()
+
+            # Another thread is already fetching this key
+            if pending is not None:
+                try:
+                    return dict(pending.result(timeout=IN_FLIGHT_WAIT))
+                except FutureTimeoutError:
+                    return dict(_fetch(func, key, args, kwargs))
+
+            try:
+                data = _fetch(func, key, args, kwargs)
+            except BaseException as e:
+                future.set_exception(e)
+                raise
+            else:
+                future.set_result(data)
+            finally:
+                with _lock:
+                    _in_flight.pop(key, None)
+            return dict(data)
+
+        return wrapper
+
+    return decorator
+
+
+def _fetch(func, key, args, kwargs):
+    """Call the client function and store the response unless it failed"""
+    data = func(*args, **kwargs)
+
+    # Don't memoize failures
+    if data and "error" not in data:
+        with _lock:
+            _cache[key] = data
+    return data
+
+
+def clear_cache():
+    """Drop every cached SerpAPI response"""
+    with _lock:
+        _cache.clear()
@@ -0,0 +1,170 @@
+"""
+Semantic cache for Google Shopping lookups
+Serves a stored response when a new query is a near-duplicate of one already
+searched ("coffee maker" vs "coffeemaker"), saving a paid SerpAPI call
+"""
+
+import math
+import re
+import sqlite3
+import time
+from collections import Counter
+from contextlib import closing
+from functools import wraps
+from pathlib import Path
+
+import orjson
+
+from backend.config import (
+    SERPAPI_CACHE_TTL,
+    SERPAPI_SEMANTIC_CACHE_DISTANCE,
+    SERPAPI_SEMANTIC_CACHE_ENABLED,
+    SERPAPI_SEMANTIC_CACHE_PATH,
+)
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS semantic_cache (
+    namespace TEXT NOT NULL,
+    query TEXT NOT NULL,
+    vector TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS semantic_cache_namespace_created ON semantic_cache (namespace, created);
+"""
+
+
+def embed(query: str) -> dict:
+    """
+    Embed a query as a sparse, L2-normalized character-trigram vector.
+    Case, punctuation and spacing are ignored so "Coffee-Maker" and
+    "coffeemaker" map to the same vector.
+
+    Args:
+        query (str): The product search query.
+    Returns:
+        dict: Mapping of trigram -> weight.
+    """
+    text = _NON_ALNUM.sub("", query.lower())
+    if len(text) < 3:
+        counts = Counter([text]) if text else Counter()
+    else:
+        counts = Counter(text[i:i + 3] for i in range(len(text) - 2))
+
+    norm = math.sqrt(sum(c * c for c in counts.values()))
+    return {gram: c / norm for gram, c in counts.items()} if norm else {}
+
+
+def numbers(query: str) -> list:
+    """
+    The numbers in a query (sizes, strengths, counts), sorted.
+    Queries only match when these are identical: "tylenol 100 count" and
+    "tylenol 24 count" embed closely but are different products.
+    """
+    return sorted(_NUMBER.findall(query))
+
+
+def cosine_distance(a: dict, b: dict) -> float:
+    """Cosine distance between two vectors produced by embed()"""
+    if len(a) > len(b):
+        a, b = b, a
+    return 1.0 - sum(w * b.get(gram, 0.0) for gram, w in a.items())
+
+
+def _connect():
+    """Open the cache database; use as `with closing(_connect()) as conn, conn:` to commit and close"""
+    # sqlite3 does not create missing parent directories (e.g. /app/cache)
+    Path(SERPAPI_SEMANTIC_CACHE_PATH).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(SERPAPI_SEMANTIC_CACHE_PATH)
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def lookup(namespace: str, query: str):
+    """
+    Find the closest unexpired cached response for a query.
+
+    Args:
+        namespace (str): Locale/location namespace; entries never match across namespaces.
+        query (str): The product search query.
+    Returns:
+        dict or None: The cached response if one is within SERPAPI_SEMANTIC_CACHE_DISTANCE
+            and has the same numbers as the query.
+    """
+    vector = embed(query)
+    if not vector:
+        return None
+    query_numbers = numbers(query)
+
+    with closing(_connect()) as conn, conn:
+        rows = conn.execute(
+            "SELECT query, vector, response FROM semantic_cache WHERE namespace = ? AND created >= ?",
+            (namespace, time.time() - SERPAPI_CACHE_TTL),
+        ).fetchall()
+
+    best_distance, best_response = None, None
+    for stored_query, stored_vector, response in rows:
+        if numbers(stored_query) != query_numbers:
+            continue
+        distance = cosine_distance(vector, orjson.loads(stored_vector))
+        if best_distance is None or distance < best_distance:
+            best_distance, best_response = distance, response
+
+    if best_distance is not None and best_distance < SERPAPI_SEMANTIC_CACHE_DISTANCE:
+        return orjson.loads(best_response)
+    return None
+
+
+def store(namespace: str, query: str, response: dict):
+    """Store a response for a query and drop expired entries"""
+    vector = embed(query)
+    if not vector:
+        return
+
+    now = time.time()
+    with closing(_connect()) as conn, conn:
+        conn.execute("DELETE FROM semantic_cache WHERE created < ?", (now - SERPAPI_CACHE_TTL,))
+        conn.execute(
+            "INSERT INTO semantic_cache (namespace, query, vector, response, created) VALUES (?, ?, ?, ?, ?)",
+            (namespace, query, orjson.dumps(vector).decode(), orjson.dumps(response).decode(), now),
+        )
+
+
+def semantic_cached(namespace_func):
+    """
+    Decorator adding the semantic cache in front of a query-based client function
+
+    The wrapped function must take the query as its first argument. Calls with
+    force_refresh=True skip the lookup; calls with no_cache=True bypass the
+    cache entirely. Error and empty responses are never stored.
+
+    Args:
+        namespace_func: Callable taking the wrapped function's arguments and
+            returning the namespace string (engine, locale, location).
+    Returns:
+        The decorator to apply to the client function.
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(query, *args, **kwargs):
+            if not SERPAPI_SEMANTIC_CACHE_ENABLED or kwargs.get("no_cache"):
+                return func(query, *args, **kwargs)
+
+            namespace = namespace_func(query, *args, **kwargs)
+            if not kwargs.get("force_refresh"):
+                data = lookup(namespace, query)
+                if data is not None:
+                    return data
+
+            data = func(query, *args, **kwargs)
+            if data and "error" not in data:
+                store(namespace, query, data)
+            return data
+
+        return wrapper
+
+    return decorator
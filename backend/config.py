@@ -3,7 +3,9 @@ Backend configuration module
 Handles environment-specific settings and validates required API keys
 """
 
+import logging
 import os
+import re
 import sys
 from dotenv import load_dotenv
 
@@ -12,6 +14,7 @@ load_dotenv()
 
 # Environment configuration
 FLASK_ENV = os.getenv('FLASK_ENV', 'development')
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'WARNING' if FLASK_ENV == 'production' else 'INFO')
 
 # API Keys
 SERPAPI_KEY = os.getenv("SERPAPI_KEY")
@@ -20,6 +23,53 @@ GOOGLE_CLOUD_API_KEY = os.getenv("GOOGLE_CLOUD_API_KEY")
 # API endpoints
 BASE_URL = "https://serpapi.com/search.json"
 
+# SerpAPI response caching
+SERPAPI_CACHE_ENABLED = os.getenv('SERPAPI_CACHE_ENABLED', 'true').lower() == 'true'
+SERPAPI_CACHE_TTL = int(os.getenv('SERPAPI_CACHE_TTL', 3600))  # Seconds
+SERPAPI_CACHE_MAXSIZE = int(os.getenv('SERPAPI_CACHE_MAXSIZE', 512))  # Entries
+SERPAPI_CACHE_PATH = os.getenv('SERPAPI_CACHE_PATH', 'serpapi_cache')  # SQLite file, '.sqlite' is appended
+
+# Semantic (near-duplicate query) cache for Google Shopping searches, opt-in
+SERPAPI_SEMANTIC_CACHE_ENABLED = os.getenv('SERPAPI_SEMANTIC_CACHE_ENABLED', 'false').lower() == 'true'
+SERPAPI_SEMANTIC_CACHE_PATH = os.getenv('SERPAPI_SEMANTIC_CACHE_PATH', 'serpapi_semantic_cache.sqlite')
+SERPAPI_SEMANTIC_CACHE_DISTANCE = float(os.getenv('SERPAPI_SEMANTIC_CACHE_DISTANCE', 0.15))  # Max cosine distance
+
+
+_API_KEY_VALUE = re.compile(r'\b((?:api_)?key=)[^&\s\'"]+')
+
+
+def redact_api_keys(text):
+    """Mask api_key/key query values (SerpAPI, Vision) in a URL or message"""
+    return _API_KEY_VALUE.sub(r'\1REDACTED', text)
+
+
+class RedactApiKeysFilter(logging.Filter):
+    """Log filter applying redact_api_keys, e.g. to urllib3's retry warnings that include the request URL"""
+
+    def filter(self, record):
+        message = record.getMessage()
+        redacted = redact_api_keys(message)
+        if redacted != message:
+            record.msg, record.args = redacted, ()
+        return True
+
+
+def configure_logging():
+    """
+    Configure root logging at LOG_LEVEL
+    Defaults to WARNING in production so per-request debug output is dropped.
+    urllib3 stays at WARNING because its debug output lists full request URLs,
+    and every root handler redacts API keys from messages.
+    """
+    logging.basicConfig(
+        level=LOG_LEVEL.upper(),
+        format='%(asctime)s %(levelname)s %(name)s: %(message)s',
+    )
+    logging.getLogger('urllib3').setLevel(max(logging.WARNING, logging.getLogger().level))
+    for handler in logging.getLogger().handlers:
+        if not any(isinstance(f, RedactApiKeysFilter) for f in handler.filters):
+            handler.addFilter(RedactApiKeysFilter())
+
 
 def validate_config():
     """
@@ -1,101 +1,613 @@
 
+import argparse
+import atexit
 import base64
+import hashlib
+import mmap
+import orjson
 import requests
 import sys
 import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import count, islice
 from pathlib import Path
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Heavy and optional dependencies (OpenCV, google-cloud-vision, PyTurboJPEG)
+# are imported on first use to keep module import fast.
+
+
+@lru_cache(maxsize=None)
+def _load_vision():
+    """
+    Optional: the gRPC client sends raw image bytes instead of base64-in-JSON
+    Returns the google.cloud.vision module, or None when it is not installed
+    """
+    try:
+        from google.cloud import vision
+    except ImportError:
+        return None
+    return vision
+
+
+@lru_cache(maxsize=None)
+def _load_turbo_jpeg():
+    """
+    Optional: libjpeg-turbo decodes/encodes JPEGs several times faster than OpenCV's libjpeg
+    Returns a TurboJPEG instance, or None when the package or shared library is missing
+    """
+    try:
+        from turbojpeg import TurboJPEG
+        return TurboJPEG()
+    except Exception:
+        return None
+
+
+# Vision accepts at most 16 images per images:annotate request
+MAX_IMAGES_PER_REQUEST = 16
+# Batches sent concurrently when OCR-ing more than 16 images
+MAX_CONCURRENT_REQUESTS = 8
+# A rate-limited (429) batch is retried this many times before it fails
+RATE_LIMIT_RETRIES = 3
+# Pause in seconds when a 429 carries no usable Retry-After header
+DEFAULT_RETRY_AFTER = 15
+# Client-side cap matching the default Vision quota, so workers slow down before
+# hitting 429; 0 disables it. The gate is per process, so the budget is split
+# across the WEB_CONCURRENCY gunicorn workers sharing the API key.
+VISION_REQUESTS_PER_MINUTE = int(os.getenv('VISION_REQUESTS_PER_MINUTE', 1800))
+WEB_CONCURRENCY = max(1, int(os.getenv('WEB_CONCURRENCY', 1)))
+# Transient 5xx responses are retried on the session with exponential backoff;
+# 429 is left to the shared rate-limit gate below. urllib3 would otherwise
+# retry any 429 carrying Retry-After on its own, so that header is ignored here.
+# images:annotate is idempotent, so retrying the POST is safe.
+RETRY_POLICY = Retry(
+    total=3,
+    backoff_factor=1.0,
+    status_forcelist=(500, 502, 503, 504),
+    allowed_methods=frozenset(['POST']),
+    respect_retry_after_header=False,
+    raise_on_status=False,
+)
+# (connect, read) timeouts in seconds for a single Vision REST request; the
+# read timeout also bounds each gRPC attempt
+REQUEST_TIMEOUT = (3.05, 30)
+# Seconds the gRPC client keeps retrying UNAVAILABLE/INTERNAL errors, in place
+# of the client library's 600s default, so a stalled call cannot outlive the worker
+GRPC_RETRY_DEADLINE = 20
+VISION_REST_URL = 'https://vision.googleapis.com/v1/images:annotate'
+# Partial response: only the fields we parse. Leaves out bounding polygons and
+# the per-symbol fullTextAnnotation tree, which make up most of a TEXT_DETECTION response
+VISION_REST_FIELDS = 'responses(error,textAnnotations/description)'
+# Images are downscaled to this longest side and re-encoded before upload
+UPLOAD_MAX_SIDE = int(os.getenv('OCR_UPLOAD_MAX_SIDE', 1600))
+UPLOAD_JPEG_QUALITY = int(os.getenv('OCR_UPLOAD_JPEG_QUALITY', 85))
+# File types picked up by the --batch command line mode
+IMAGE_EXTENSIONS = frozenset({'.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp'})
+# Command line output
+SEPARATOR = '=' * 60
+SETUP_INSTRUCTIONS = """
+Setup instructions:
+1. Go to https://console.cloud.google.com
+2. Create a new project or select existing one
+3. Enable Cloud Vision API
+4. Go to 'Credentials' and create an API key
+5. Set environment variable: export GOOGLE_CLOUD_API_KEY='your-key'"""
+# Successful results are cached on disk by image content hash. Off unless set,
+# since the web app would otherwise keep the text of every upload; --batch runs
+# fall back to BATCH_CACHE_DIR (set OCR_CACHE_DIR='' to keep them uncached too)
+OCR_CACHE_DIR = os.getenv('OCR_CACHE_DIR') or None
+BATCH_CACHE_DIR = '.ocr_cache'
+# Least recently used entries beyond this count are deleted; the directory is
+# scanned for that on the first write and then once every OCR_CACHE_EVICT_EVERY writes
+OCR_CACHE_MAX_ENTRIES = int(os.getenv('OCR_CACHE_MAX_ENTRIES', 2000))
+OCR_CACHE_EVICT_EVERY = 100
+# Part of every cache key; bump when the request features or upload preprocessing change
+OCR_CACHE_VERSION = f'TEXT_DETECTION:1:{UPLOAD_MAX_SIDE}:{UPLOAD_JPEG_QUALITY}'
+
+
+def _create_session():
+    """Build the REST session; TCP/TLS connections to Vision are reused across calls"""
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(pool_connections=10, pool_maxsize=10, max_retries=RETRY_POLICY))
+    return session
+
+
+def _close_session():
+    _session.close()
+
+
+def _reset_after_fork():
+    """Forked workers must not share the parent's pooled sockets, gRPC channels or locks"""
+    global _session, _rate_limit_gate, _vision_clients_lock
+    _session = _create_session()
+    _rate_limit_gate = _RateLimitGate(VISION_REQUESTS_PER_MINUTE / WEB_CONCURRENCY)
+    _vision_clients.clear()
+    _vision_clients_lock = threading.Lock()
+
+
+_session = _create_session()
+atexit.register(_close_session)
+
+
+class _RateLimited(Exception):
+    """Raised by a transport when Vision answers 429 / RESOURCE_EXHAUSTED"""
+
+    def __init__(self, retry_after):
+        super().__init__(f'Rate limited by Vision API, retry after {retry_after}s')
+        self.retry_after = retry_after
+
+
+class _RateLimitGate:
+    """
+    Throttle and backoff shared by all OCR worker threads
+    Requests are spaced to stay under requests_per_minute, and one 429 pauses
+    every worker until Retry-After has passed, instead of each thread hitting
+    the limit and sleeping on its own
+    """
+
+    def __init__(self, requests_per_minute):
+        self._lock = threading.Lock()
+        # Zero or less leaves requests unthrottled; 429 pauses still apply
+        self._interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._next_slot = 0.0
+        self._resume_at = 0.0
+
+    def wait(self):
+        """Block until this thread may send its next request"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot, self._resume_at)
+            self._next_slot = slot + self._interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def pause(self, seconds):
+        """Hold back all workers for the next `seconds` seconds"""
+        with self._lock:
+            self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+
+_rate_limit_gate = _RateLimitGate(VISION_REQUESTS_PER_MINUTE / WEB_CONCURRENCY)
 
 
 def extract_text_from_image(image_path, api_key):
     """
     Extract text from an image using Google Cloud Vision API
+
+    Uses the google-cloud-vision gRPC client when it is installed and falls
+    back to the REST endpoint otherwise.
     
     Args:
-        image_path: Path to the image file (jpg, png, gif, etc.)
+        image_path: Path to the image file (jpg, png, gif, etc.), or the
+            encoded image itself as bytes (e.g. an upload or cv2.imencode output)
         api_key: Your Google Cloud Vision API key
     
     Returns:
         Dictionary with 'success' (bool), 'text' (str), and 'error' (str) keys
     """
+    return extract_text_from_images([image_path], api_key)[0]
+
+
+def extract_text_from_images(image_paths, api_key, max_workers=MAX_CONCURRENT_REQUESTS):
+    """
+    Extract text from several images, sending up to 16 images per Vision request
+
+    Batches are sent concurrently, so N images cost about ceil(N / 16)
+    round-trips of latency instead of N. A 429 from Vision pauses all batches
+    for the Retry-After period before they are retried.
+
+    Args:
+        image_paths: List of image file paths and/or encoded image bytes
+        api_key: Your Google Cloud Vision API key
+        max_workers: Maximum number of batches in flight at once
+
+    Returns:
+        List of result dictionaries (see extract_text_from_image), in input order
+    """
+    batches = list(_batched(image_paths, MAX_IMAGES_PER_REQUEST))
+    if len(batches) <= 1:
+        return _extract_text_batch(batches[0] if batches else [], api_key)
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(batches))) as executor:
+        batch_results = executor.map(lambda batch: _extract_text_batch(batch, api_key), batches)
+        return [result for results in batch_results for result in results]
+
+
+def _batched(items, size):
+    """Yield successive lists of at most `size` items"""
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _extract_text_batch(image_paths, api_key):
+    """OCR up to MAX_IMAGES_PER_REQUEST images with a single Vision request"""
+    results = [None] * len(image_paths)
+    contents = []
+    positions = []
+    cache_keys = []
+
+    # Read image bytes; unreadable files fail individually
+    for i, image_path in enumerate(image_paths):
+        try:
+            with _open_image(image_path) as content:
+                cache_key = _cache_key(content)
+                cached = _cache_get(cache_key)
+                if cached is not None:
+                    results[i] = cached
+                    continue
+                contents.append(_prepare_upload(content))
+            positions.append(i)
+            cache_keys.append(cache_key)
+        except FileNotFoundError:
+            results[i] = _failure(f'Image file not found: {image_path}')
+        except Exception as e:
+            results[i] = _failure(f'Error: {str(e)}')
+
+    if contents:
+        annotate = _annotate_grpc if _load_vision() is not None else _annotate_rest
+        for _ in range(RATE_LIMIT_RETRIES + 1):
+            _rate_limit_gate.wait()
+            try:
+                annotated = annotate(contents, api_key)
+                break
+            except _RateLimited as e:
+                _rate_limit_gate.pause(e.retry_after)
+                annotated = [_failure(str(e)) for _ in contents]
+            except Exception as e:
+                annotated = [_failure(f'Error: {str(e)}') for _ in contents]
+                break
+
+        for i, cache_key, result in zip(positions, cache_keys, annotated):
+            results[i] = result
+            if result['success']:
+                _cache_put(cache_key, result)
+
+    return results
+
+
+@contextmanager
+def _open_image(image):
+    """
+    Yield the encoded bytes of an image given as a file path or as bytes
+
+    Files are memory-mapped rather than read, so hashing and decoding work on
+    the page cache directly and the full file is only copied onto the heap
+    if it ends up being uploaded unchanged.
+    """
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        yield image
+        return
+    with open(image, 'rb') as image_file:
+        try:
+            mapped = mmap.mmap(image_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            yield image_file.read()
+            return
+        with mapped:
+            yield mapped
+
+
+def _cache_key(content):
+    """Hash the original image bytes together with OCR_CACHE_VERSION"""
+    digest = hashlib.blake2b(content, digest_size=16)
+    digest.update(OCR_CACHE_VERSION.encode())
+    return digest.hexdigest()
+
+
+def use_batch_cache():
+    """Cache results in BATCH_CACHE_DIR for a --batch run unless OCR_CACHE_DIR is set"""
+    global OCR_CACHE_DIR
+    if 'OCR_CACHE_DIR' not in os.environ:
+        OCR_CACHE_DIR = BATCH_CACHE_DIR
+
+
+def _cache_get(cache_key):
+    """Return the cached OCR result for a key, or None on a miss"""
+    if OCR_CACHE_DIR is None:
+        return None
+    cache_path = Path(OCR_CACHE_DIR) / f'{cache_key}.json'
     try:
-        # Read and encode image to base64
-        with open(image_path, 'rb') as image_file:
-            image_content = image_file.read()
-        
-        base64_image = base64.b64encode(image_content).decode('utf-8')
-        
-        # Prepare API request
-        url = f'https://vision.googleapis.com/v1/images:annotate?key={api_key}'
-        
-        payload = {
-            'requests': [{
-                'image': {
-                    'content': base64_image
-                },
-                'features': [{
-                    'type': 'TEXT_DETECTION',
-                    'maxResults': 1
-                }]
-            }]
-        }
-        
-        # Send request to Google Cloud Vision API
-        response = requests.post(url, json=payload)
-        result = response.json()
-        
-        # Parse response
-        if response.status_code != 200:
-            return {
-                'success': False,
-                'text': '',
-                'error': f'API request failed with status code {response.status_code}'
-            }
-        
-        if 'responses' in result and result['responses']:
-            response_data = result['responses'][0]
-            
-            # Check for errors
-            if 'error' in response_data:
-                return {
-                    'success': False,
-                    'text': '',
-                    'error': response_data['error'].get('message', 'Unknown API error')
-                }
-            
-            # Extract text
-            text_annotations = response_data.get('textAnnotations', [])
-            if text_annotations:
-                extracted_text = text_annotations[0]['description']
-                return {
-                    'success': True,
-                    'text': extracted_text,
-                    'error': ''
-                }
-            else:
-                return {
-                    'success': True,
-                    'text': '',
-                    'error': 'No text detected in image'
-                }
+        result = orjson.loads(cache_path.read_bytes())
+        # The modification time doubles as the last-used time for eviction
+        os.utime(cache_path)
+        return result
+    except (OSError, orjson.JSONDecodeError):
+        return None
+
+
+# Cache writes made by this process; next() on itertools.count is thread-safe in CPython
+_cache_writes = count()
+
+
+def _cache_put(cache_key, result):
+    """Store an OCR result; the file is written under a temp name and renamed into place"""
+    if OCR_CACHE_DIR is None:
+        return
+    try:
+        cache_dir = Path(OCR_CACHE_DIR)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        # Unique across threads and worker processes writing the same key
+        with tempfile.NamedTemporaryFile(dir=cache_dir, suffix='.tmp', delete=False) as temp_file:
+            temp_file.write(orjson.dumps(result))
+        os.replace(temp_file.name, cache_dir / f'{cache_key}.json')
+        if next(_cache_writes) % OCR_CACHE_EVICT_EVERY == 0:
+            _cache_evict(cache_dir)
+    except OSError:
+        pass
+
+
+def _cache_evict(cache_dir):
+    """Delete the least recently used entries beyond OCR_CACHE_MAX_ENTRIES"""
+    entries = []
+    with os.scandir(cache_dir) as scan:
+        for entry in scan:
+            if entry.name.endswith('.json'):
+                try:
+                    entries.append((entry.stat().st_mtime, entry.path))
+                except OSError:
+                    pass
+    if len(entries) <= OCR_CACHE_MAX_ENTRIES:
+        return
+    entries.sort()
+    for _, path in entries[:len(entries) - OCR_CACHE_MAX_ENTRIES]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _prepare_upload(content, max_side=UPLOAD_MAX_SIDE, jpeg_quality=UPLOAD_JPEG_QUALITY):
+    """
+    Shrink an image before upload
+
+    Downscales so the longest side is at most max_side pixels (Vision OCR
+    accuracy on label text plateaus around 1600) and re-encodes as JPEG at
+    jpeg_quality. Transparent PNG/WebP images are flattened onto white first,
+    so dark text on a transparent background stays readable. Returns the
+    original bytes when the image cannot be decoded or when the re-encoded
+    image would not be smaller.
+
+    content may be any bytes-like object (e.g. an mmap); the result is
+    always bytes that stay valid after content is released.
+    """
+    import cv2
+    import numpy as np
+
+    turbo_jpeg = _load_turbo_jpeg()
+    try:
+        # TurboJPEG ignores EXIF orientation, so rotated phone photos go through
+        # cv2.imdecode, which applies it (the re-encoded JPEG carries no EXIF)
+        if turbo_jpeg is not None and content[:2] == b'\xff\xd8' and _jpeg_orientation(content) == 1:
+            image = turbo_jpeg.decode(content)
+        elif content[:8] == b'\x89PNG\r\n\x1a\n' or (content[:4] == b'RIFF' and content[8:12] == b'WEBP'):
+            # Formats that can carry alpha; IMREAD_COLOR would drop it and leave
+            # transparent pixels black
+            image = _flatten_to_bgr(cv2.imdecode(np.frombuffer(content, np.uint8), cv2.IMREAD_UNCHANGED))
         else:
-            return {
-                'success': False,
-                'text': '',
-                'error': 'Invalid API response'
-            }
-            
-    except FileNotFoundError:
-        return {
-            'success': False,
-            'text': '',
-            'error': f'Image file not found: {image_path}'
-        }
-    except Exception as e:
+            image = cv2.imdecode(np.frombuffer(content, np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            return bytes(content)
+
+        height, width = image.shape[:2]
+        scale = max_side / max(height, width)
+        if scale < 1:
+            image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+        if turbo_jpeg is not None:
+            encoded = turbo_jpeg.encode(image, quality=jpeg_quality)
+        else:
+            ok, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+            if not ok:
+                return bytes(content)
+            encoded = buffer.tobytes()
+    except Exception:
+        return bytes(content)
+
+    return encoded if len(encoded) < len(content) else bytes(content)
+
+
+def _jpeg_orientation(content):
+    """Return the EXIF Orientation (1-8) of a JPEG, or 1 when it has none"""
+    try:
+        pos = 2
+        while content[pos] == 0xFF and content[pos + 1] not in (0xD9, 0xDA):
+            length = int.from_bytes(content[pos + 2:pos + 4], 'big')
+            if content[pos + 1] == 0xE1 and content[pos + 4:pos + 10] == b'Exif\x00\x00':
+                tiff = content[pos + 10:pos + 2 + length]
+                order = 'little' if tiff[:2] == b'II' else 'big'
+                ifd = int.from_bytes(tiff[4:8], order)
+                for entry in range(ifd + 2, ifd + 2 + 12 * int.from_bytes(tiff[ifd:ifd + 2], order), 12):
+                    if int.from_bytes(tiff[entry:entry + 2], order) == 0x0112:
+                        return int.from_bytes(tiff[entry + 8:entry + 10], order)
+                return 1
+            pos += 2 + length
+    except IndexError:
+        pass
+    return 1
+
+
+def _flatten_to_bgr(image):
+    """Convert an IMREAD_UNCHANGED decode to 8-bit BGR, compositing any alpha channel onto white"""
+    import cv2
+    import numpy as np
+
+    if image is None:
+        return None
+    if image.dtype == np.uint16:
+        image = (image >> 8).astype(np.uint8)
+    if image.ndim == 2:
+        return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    if image.shape[2] == 4:
+        alpha = image[:, :, 3:].astype(np.uint16)
+        blended = (image[:, :, :3] * alpha + 255 * (255 - alpha)) // 255
+        return blended.astype(np.uint8)
+    return image
+
+
+def _failure(error):
+    return {
+        'success': False,
+        'text': '',
+        'error': error
+    }
+
+
+def _text_result(text):
+    if text:
         return {
-            'success': False,
-            'text': '',
-            'error': f'Error: {str(e)}'
+            'success': True,
+            'text': text,
+            'error': ''
         }
+    return {
+        'success': True,
+        'text': '',
+        'error': 'No text detected in image'
+    }
+
+
+_vision_clients = {}
+_vision_clients_lock = threading.Lock()
+
+
+def _get_vision_client(api_key):
+    """
+    Return the shared Vision client for the API key, reused so the gRPC channel stays open
+    Concurrent first calls build a single client instead of one channel each
+    """
+    client = _vision_clients.get(api_key)
+    if client is None:
+        with _vision_clients_lock:
+            client = _vision_clients.get(api_key)
+            if client is None:
+                client = _load_vision().ImageAnnotatorClient(client_options={'api_key': api_key})
+                _vision_clients[api_key] = client
+    return client
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+@lru_cache(maxsize=None)
+def _grpc_rate_limit_errors():
+    """The google.api_core exceptions for 429 / RESOURCE_EXHAUSTED"""
+    from google.api_core import exceptions
+    return exceptions.ResourceExhausted, exceptions.TooManyRequests
+
+
+@lru_cache(maxsize=None)
+def _grpc_retry():
+    """Backoff for transient gRPC errors, matching RETRY_POLICY's 1s/2s/4s steps"""
+    from google.api_core import exceptions, retry
+    return retry.Retry(
+        predicate=retry.if_exception_type(exceptions.ServiceUnavailable, exceptions.InternalServerError),
+        initial=1.0,
+        multiplier=2.0,
+        maximum=4.0,
+        timeout=GRPC_RETRY_DEADLINE,
+    )
+
+
+def _annotate_grpc(contents, api_key):
+    """Run TEXT_DETECTION on raw image bytes through the gRPC client"""
+    vision = _load_vision()
+    client = _get_vision_client(api_key)
+    feature = {'type_': vision.Feature.Type.TEXT_DETECTION, 'max_results': 1}
+    try:
+        batch = client.batch_annotate_images(
+            requests=[{'image': {'content': content}, 'features': [feature]} for content in contents],
+            retry=_grpc_retry(),
+            timeout=REQUEST_TIMEOUT[1],
+        )
+    except _grpc_rate_limit_errors() as e:
+        raise _RateLimited(DEFAULT_RETRY_AFTER) from e
+
+    results = []
+    for response in batch.responses:
+        if response.error.message:
+            results.append(_failure(response.error.message))
+        elif response.text_annotations:
+            results.append(_text_result(response.text_annotations[0].description))
+        else:
+            results.append(_text_result(''))
+    return results
+
+
+def _annotate_rest(contents, api_key):
+    """Run TEXT_DETECTION through the REST endpoint with base64-encoded images"""
+    # Send request to Google Cloud Vision API
+    response = _session.post(
+        VISION_REST_URL,
+        params={'fields': VISION_REST_FIELDS},
+        data=_rest_body(contents),
+        # In a header rather than ?key= so the key never shows up in logged URLs
+        headers={'Content-Type': 'application/json', 'X-Goog-Api-Key': api_key},
+        timeout=REQUEST_TIMEOUT
+    )
+    if response.status_code == 429:
+        raise _RateLimited(_retry_after_seconds(response.headers.get('Retry-After')))
+    result = orjson.loads(response.content)
+    
+    # Parse response
+    if response.status_code != 200:
+        return [_failure(f'API request failed with status code {response.status_code}') for _ in contents]
+
+    responses = result.get('responses', [])
+    if len(responses) != len(contents):
+        return [_failure('Invalid API response') for _ in contents]
+
+    results = []
+    for response_data in responses:
+        # Check for errors
+        if 'error' in response_data:
+            results.append(_failure(response_data['error'].get('message', 'Unknown API error')))
+            continue
+
+        # Extract text
+        text_annotations = response_data.get('textAnnotations', [])
+        results.append(_text_result(text_annotations[0]['description'] if text_annotations else ''))
+    return results
+
+
+# Per-image request body around the base64 content, serialized once
+_REST_IMAGE_PREFIX = b'{"image":{"content":"'
+_REST_IMAGE_SUFFIX = b'"},"features":' + orjson.dumps([{'type': 'TEXT_DETECTION', 'maxResults': 1}]) + b'}'
+
+
+def _rest_body(contents):
+    """
+    Build the images:annotate JSON body as bytes
+
+    base64 output is already valid JSON string content, so each image is
+    encoded straight into the body instead of being decoded to str and
+    re-serialized inside a dict; only one encoded image is alive at a time.
+    """
+    body = bytearray(b'{"requests":[')
+    for i, content in enumerate(contents):
+        if i:
+            body += b','
+        body += _REST_IMAGE_PREFIX
+        body += base64.b64encode(content)
+        body += _REST_IMAGE_SUFFIX
+    body += b']}'
+    return bytes(body)
+
+
+def _retry_after_seconds(header):
+    """Parse a Retry-After header given in seconds, falling back to DEFAULT_RETRY_AFTER"""
+    try:
+        return max(0.0, float(header))
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER
 
 
 def save_text_to_file(text, output_path):
@@ -109,12 +621,25 @@ def save_text_to_file(text, output_path):
         return False
 
 
+def list_images(directory):
+    """Return the image files directly inside a directory, sorted by name"""
+    with os.scandir(directory) as entries:
+        return sorted(
+            entry.path for entry in entries
+            if entry.is_file() and os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS
+        )
+
+
 def main():
     """Main function for command line usage"""
+    parser = argparse.ArgumentParser(description='Extract text from images with Google Cloud Vision')
+    parser.add_argument('image', nargs='?', help='Path to the image file')
+    parser.add_argument('--batch', metavar='DIR', help='OCR every image in DIR, 16 images per Vision request')
+    args = parser.parse_args()
     
-    print("=" * 60)
+    print(SEPARATOR)
     print("Google Cloud Vision OCR - Text Extraction")
-    print("=" * 60)
+    print(SEPARATOR)
     print()
     
     # Get API key from environment variable or command line
@@ -126,18 +651,16 @@ def main():
         
         if not api_key:
             print("Error: API key is required")
-            print("\nSetup instructions:")
-            print("1. Go to https://console.cloud.google.com")
-            print("2. Create a new project or select existing one")
-            print("3. Enable Cloud Vision API")
-            print("4. Go to 'Credentials' and create an API key")
-            print("5. Set environment variable: export GOOGLE_CLOUD_API_KEY='your-key'")
+            print(SETUP_INSTRUCTIONS)
             sys.exit(1)
     
+    if args.batch:
+        run_batch(args.batch, api_key)
+        return
+    
     # Get image path
-    if len(sys.argv) > 1:
-        image_path = sys.argv[1]
-    else:
+    image_path = args.image
+    if not image_path:
         print("Enter the path to your image:")
         image_path = input("> ").strip()
     
@@ -145,25 +668,20 @@ def main():
         print("Error: Image path is required")
         sys.exit(1)
     
-    # Check if file exists
-    if not Path(image_path).exists():
-        print(f"Error: Image file '{image_path}' not found")
-        sys.exit(1)
-    
     print(f"\nProcessing: {image_path}")
     print("Please wait...")
     print()
     
-    # Extract text from image
+    # Extract text from image; a missing file comes back as an error result
     result = extract_text_from_image(image_path, api_key)
     
     if result['success']:
         if result['text']:
-            print("=" * 60)
+            print(SEPARATOR)
             print("EXTRACTED TEXT:")
-            print("=" * 60)
+            print(SEPARATOR)
             print(result['text'])
-            print("=" * 60)
+            print(SEPARATOR)
             print()
             
             # Save to file
@@ -181,5 +699,43 @@ def main():
         sys.exit(1)
 
 
+def run_batch(directory, api_key):
+    """
+    OCR every image in a directory, saving each text to <file name>_extracted_text.txt
+    in the working directory; the extension is kept so a.png and a.jpg do not collide
+    """
+    use_batch_cache()
+    try:
+        image_paths = list_images(directory)
+    except OSError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    
+    if not image_paths:
+        print(f"No images found in '{directory}'")
+        sys.exit(1)
+    
+    print(f"Processing {len(image_paths)} images from: {directory}")
+    print("Please wait...")
+    print()
+    
+    failures = 0
+    for image_path, result in zip(image_paths, extract_text_from_images(image_paths, api_key)):
+        if not result['success']:
+            failures += 1
+            print(f"{image_path}: Error: {result['error']}")
+        elif not result['text']:
+            print(f"{image_path}: Warning: {result['error']}")
+        else:
+            output_filename = Path(image_path).name + '_extracted_text.txt'
+            if save_text_to_file(result['text'], output_filename):
+                print(f"{image_path}: {len(result['text'])} characters saved to {output_filename}")
+    
+    print()
+    print(f"Done: {len(image_paths) - failures} of {len(image_paths)} images processed")
+    if failures:
+        sys.exit(1)
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -3,98 +3,43 @@ Google Cloud Vision OCR - Item Description Extractor
 Extracts only product descriptions from price labels, filtering out prices, barcodes, etc.
 """
 
-import base64
-import requests
+import argparse
 import sys
 import os
 import re
 from pathlib import Path
 
+# Add parent directory to path to allow imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-def extract_text_from_image(image_path, api_key):
-    """
-    Extract text from an image using Google Cloud Vision API
-    
-    Args:
-        image_path: Path to the image file (jpg, png, gif, etc.)
-        api_key: Your Google Cloud Vision API key
-    
-    Returns:
-        Dictionary with 'success' (bool), 'text' (str), and 'error' (str) keys
-    """
-    try:
-        with open(image_path, 'rb') as image_file:
-            image_content = image_file.read()
-        
-        base64_image = base64.b64encode(image_content).decode('utf-8')
-        
-        url = f'https://vision.googleapis.com/v1/images:annotate?key={api_key}'
-        
-        payload = {
-            'requests': [{
-                'image': {
-                    'content': base64_image
-                },
-                'features': [{
-                    'type': 'TEXT_DETECTION',
-                    'maxResults': 1
-                }]
-            }]
-        }
-        
-        response = requests.post(url, json=payload)
-        result = response.json()
-        
-        if response.status_code != 200:
-            return {
-                'success': False,
-                'text': '',
-                'error': f'API request failed with status code {response.status_code}'
-            }
-        
-        if 'responses' in result and result['responses']:
-            response_data = result['responses'][0]
-            
-            if 'error' in response_data:
-                return {
-                    'success': False,
-                    'text': '',
-                    'error': response_data['error'].get('message', 'Unknown API error')
-                }
-            
-            text_annotations = response_data.get('textAnnotations', [])
-            if text_annotations:
-                extracted_text = text_annotations[0]['description']
-                return {
-                    'success': True,
-                    'text': extracted_text,
-                    'error': ''
-                }
-            else:
-                return {
-                    'success': True,
-                    'text': '',
-                    'error': 'No text detected in image'
-                }
-        else:
-            return {
-                'success': False,
-                'text': '',
-                'error': 'Invalid API response'
-            }
-            
-    except FileNotFoundError:
-        return {
-            'success': False,
-            'text': '',
-            'error': f'Image file not found: {image_path}'
-        }
-    except Exception as e:
-        return {
-            'success': False,
-            'text': '',
-            'error': f'Error: {str(e)}'
-        }
+# Shares the pooled Vision session, batching and upload downscaling
+from models.ocr_processor import SEPARATOR, extract_text_from_image, extract_text_from_images, list_images, use_batch_cache
+
+
+# Lines containing any of these are prices, codes or store info, not the item.
+# Matching is unanchored, so a word also covers longer forms: "PRICE" covers
+# "UNIT PRICE", "TOTAL" covers "SUBTOTAL". Blank and all-digit lines are
+# already dropped by the length and digit-ratio checks.
+# Plain words are checked with substring tests, which are much cheaper than
+# a regex alternation; only the patterns that need regex features stay in
+# EXCLUDE_PATTERNS. Both are matched against the upper-cased line, so they
+# are written in upper case and case-insensitive matching is not needed.
+EXCLUDE_LITERALS = (
+    'ROLLBACK', 'CLEARANCE', 'SALE',
+    'PRICE', 'TOTAL', 'TAX',
+    'WALMART', 'TARGET', 'KROGER',
+)
+EXCLUDE_PATTERNS = [
+    r'\$\d',
+    r'WAS\s+\$',
+    r'(?:UPC|FAC|CAP)\s+\d',
+    r'PER\s+(?:OZ|LB|EA|CT)',
+    r'\d{12}',
+]
+
+# Compiled once at import; the bound method skips re's pattern-cache lookup per line
+EXCLUDE_REGEX = re.compile('|'.join(EXCLUDE_PATTERNS))
+_exclude_search = EXCLUDE_REGEX.search
 
 
 def filter_item_description(full_text):
@@ -108,43 +53,20 @@ def filter_item_description(full_text):
     Returns:
         Dictionary with filtered results
     """
-    lines = full_text.split('\n')
-    
-    exclude_patterns = [
-        r'\$\d+\.?\d*',
-        r'ROLLBACK',
-        r'CLEARANCE',
-        r'SALE',
-        r'WAS\s+\$',
-        r'UNIT PRICE',
-        r'PER\s+(OZ|LB|EA|CT)',
-        r'UPC\s+\d+',
-        r'FAC\s+\d+',
-        r'CAP\s+\d+',
-        r'\d{12,}',
-        r'^\d+$',
-        r'PRICE',
-        r'TOTAL',
-        r'SUBTOTAL',
-        r'TAX',
-        r'^\s*$',
-        r'WALMART|TARGET|KROGER',
-    ]
-    
-    combined_exclude = '|'.join(exclude_patterns)
-    exclude_regex = re.compile(combined_exclude, re.IGNORECASE)
-    
     filtered_lines = []
-    for line in lines:
+    for line in full_text.split('\n'):
         line = line.strip()
         
-        if exclude_regex.search(line):
+        # Cheapest check first
+        if len(line) < 3:
             continue
         
-        if len(line) < 3:
+        upper_line = line.upper()
+        if _exclude_search(upper_line) or any(word in upper_line for word in EXCLUDE_LITERALS):
             continue
         
-        if sum(c.isdigit() for c in line) / len(line) > 0.5:
+        # Skip lines that are more than half digits
+        if 2 * sum(map(str.isdigit, line)) > len(line):
             continue
         
         filtered_lines.append(line)
@@ -174,8 +96,29 @@ def extract_item_description_from_image(image_path, api_key):
     Returns:
         Dictionary with item description and metadata
     """
-    ocr_result = extract_text_from_image(image_path, api_key)
+    return _item_description_from_ocr(extract_text_from_image(image_path, api_key))
+
+
+def extract_item_descriptions_from_images(image_paths, api_key):
+    """
+    Batch workflow: OCR several images (up to 16 per Vision request) and
+    filter each for its item description
+    
+    Args:
+        image_paths: List of image file paths
+        api_key: Google Cloud Vision API key
     
+    Returns:
+        List of dictionaries as returned by extract_item_description_from_image, in input order
+    """
+    return [
+        _item_description_from_ocr(ocr_result)
+        for ocr_result in extract_text_from_images(image_paths, api_key)
+    ]
+
+
+def _item_description_from_ocr(ocr_result):
+    """Turn an OCR result into the item description workflow result"""
     if not ocr_result['success']:
         return {
             'success': False,
@@ -221,10 +164,14 @@ def save_text_to_file(text, output_path):
 
 def main():
     """Main function for command line usage"""
+    parser = argparse.ArgumentParser(description='Extract item descriptions from price label images')
+    parser.add_argument('image', nargs='?', help='Path to the image file')
+    parser.add_argument('--batch', metavar='DIR', help='Process every image in DIR, 16 images per Vision request')
+    args = parser.parse_args()
     
-    print("=" * 60)
+    print(SEPARATOR)
     print("Item Description Extractor - Google Cloud Vision OCR")
-    print("=" * 60)
+    print(SEPARATOR)
     print()
     
     api_key = os.getenv('GOOGLE_CLOUD_API_KEY')
@@ -237,9 +184,12 @@ def main():
             print("Error: API key is required")
             sys.exit(1)
     
-    if len(sys.argv) > 1:
-        image_path = sys.argv[1]
-    else:
+    if args.batch:
+        run_batch(args.batch, api_key)
+        return
+    
+    image_path = args.image
+    if not image_path:
         print("Enter the path to your image:")
         image_path = input("> ").strip()
     
@@ -247,22 +197,19 @@ def main():
         print("Error: Image path is required")
         sys.exit(1)
     
-    if not Path(image_path).exists():
-        print(f"Error: Image file '{image_path}' not found")
-        sys.exit(1)
-    
     print(f"\nProcessing: {image_path}")
     print("Please wait...")
     print()
     
+    # A missing file comes back as an error result
     result = extract_item_description_from_image(image_path, api_key)
     
     if result['success']:
-        print("=" * 60)
+        print(SEPARATOR)
         print("ITEM DESCRIPTION FOUND:")
-        print("=" * 60)
+        print(SEPARATOR)
         print(f"\n{result['item_description']}\n")
-        print("=" * 60)
+        print(SEPARATOR)
         print()
         
         if len(result.get('all_filtered_lines', [])) > 1:
@@ -289,5 +236,36 @@ def main():
         sys.exit(1)
 
 
+def run_batch(directory, api_key):
+    """Extract the item description from every image in a directory and print one line per image"""
+    use_batch_cache()
+    try:
+        image_paths = list_images(directory)
+    except OSError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    
+    if not image_paths:
+        print(f"No images found in '{directory}'")
+        sys.exit(1)
+    
+    print(f"Processing {len(image_paths)} images from: {directory}")
+    print("Please wait...")
+    print()
+    
+    failures = 0
+    for image_path, result in zip(image_paths, extract_item_descriptions_from_images(image_paths, api_key)):
+        if result['success']:
+            print(f"{image_path}: {result['item_description']}")
+        else:
+            failures += 1
+            print(f"{image_path}: Error: {result['error']}")
+    
+    print()
+    print(f"Done: {len(image_paths) - failures} of {len(image_paths)} descriptions found")
+    if failures:
+        sys.exit(1)
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,27 @@
+"""
+Unit tests for backend logging configuration
+Run offline: only formats log records
+"""
+
+import sys
+import os
+import logging
+# Add parent directory to path to allow imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.config import RedactApiKeysFilter, redact_api_keys
+
+
+def test_api_keys_are_redacted_from_log_messages():
+    record = logging.LogRecord(
+        'urllib3.connectionpool', logging.WARNING, __file__, 1,
+        "Retrying (%s) after connection broken by '%s': %s",
+        ('Retry(total=2)', 'ReadTimeoutError()', '/search.json?engine=google_shopping&api_key=SECRETKEY123&q=tylenol'),
+        None,
+    )
+
+    assert RedactApiKeysFilter().filter(record)
+    message = record.getMessage()
+    assert 'SECRETKEY123' not in message
+    assert 'api_key=REDACTED&q=tylenol' in message
+    assert redact_api_keys('/v1/images:annotate?key=AIzaXYZ') == '/v1/images:annotate?key=REDACTED'
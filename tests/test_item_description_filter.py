@@ -0,0 +1,53 @@
+"""
+Unit tests for filtering OCR text down to the item description
+Run offline: operates on sample OCR text only
+"""
+
+import sys
+import os
+# Add parent directory to path to allow imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.ocr_processor_ver1 import filter_item_description
+
+SAMPLE_OCR_TEXT = "ROLLBACK\nDVE APA PCH&CT\n$697\nUNIT PRICE\n$183\nPER OZ\n55\nWAS\n$7.97\nUPC 0530\nFAC 1 CAP 8"
+
+
+def test_price_label_sample():
+    result = filter_item_description(SAMPLE_OCR_TEXT)
+
+    assert result['item_description'] == 'DVE APA PCH&CT'
+    assert result['all_filtered_lines'] == ['DVE APA PCH&CT', 'WAS']
+    assert result['original_text'] == SAMPLE_OCR_TEXT
+
+
+def test_exclusions_are_case_insensitive():
+    text = "Subtotal\nTarget Brand Tissues\nper lb\nSale today\nCharmin Ultra Soft"
+
+    assert filter_item_description(text)['all_filtered_lines'] == ['Charmin Ultra Soft']
+
+
+def test_digit_heavy_and_short_lines_are_dropped():
+    text = "A1234\nAB12\nQ\n  \nITEM 123456789012\n   Crest 3D White   "
+
+    result = filter_item_description(text)
+
+    assert result['all_filtered_lines'] == ['AB12', 'Crest 3D White']
+    assert result['item_description'] == 'Crest 3D White'
+
+
+def test_no_description_when_only_short_lines_survive():
+    result = filter_item_description("ABC\n$4.99")
+
+    assert result['all_filtered_lines'] == ['ABC']
+    assert result['item_description'] is None
+
+
+def test_superscript_and_circled_digits_count_as_digits():
+    # str.isdigit counts these; a \d regex would not
+    assert filter_item_description("AB²³①\nCrest 3D White")['all_filtered_lines'] == ['Crest 3D White']
+
+
+def test_only_newlines_separate_lines():
+    # A carriage return inside an OCR line does not split it
+    assert filter_item_description("TOTAL \r Tylenol\nCrest 3D White")['all_filtered_lines'] == ['Crest 3D White']
@@ -0,0 +1,334 @@
+"""
+Unit tests for Vision OCR request batching
+Run offline: the Vision transport is replaced with a local fake
+"""
+
+import sys
+import os
+import threading
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+# Add parent directory to path to allow imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import models.ocr_processor as ocr_processor
+
+TEST_IMAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test_images', 'Tylenol.jpeg')
+
+
+@pytest.fixture(autouse=True)
+def no_ocr_cache(monkeypatch):
+    monkeypatch.setattr(ocr_processor, 'OCR_CACHE_DIR', None)
+
+
+def fake_rest(calls):
+    def annotate(contents, api_key):
+        calls.append(len(contents))
+        return [ocr_processor._text_result(f'text {i}') for i in range(len(contents))]
+    return annotate
+
+
+def test_images_are_batched_sixteen_per_request(monkeypatch):
+    calls = []
+    monkeypatch.setattr(ocr_processor, '_load_vision', lambda: None)
+    monkeypatch.setattr(ocr_processor, '_annotate_rest', fake_rest(calls))
+
+    results = ocr_processor.extract_text_from_images([TEST_IMAGE] * 35, 'key')
+
+    assert sorted(calls) == [3, 16, 16]
+    assert len(results) == 35
+    assert all(result['success'] for result in results)
+    assert results[16]['text'] == 'text 0'
+
+
+def test_missing_file_fails_without_affecting_the_batch(monkeypatch):
+    calls = []
+    monkeypatch.setattr(ocr_processor, '_load_vision', lambda: None)
+    monkeypatch.setattr(ocr_processor, '_annotate_rest', fake_rest(calls))
+
+    results = ocr_processor.extract_text_from_images([TEST_IMAGE, 'missing.jpg', TEST_IMAGE], 'key')
+
+    assert calls == [2]
+    assert [result['success'] for result in results] == [True, False, True]
+    assert results[1]['error'] == 'Image file not found: missing.jpg'
+    assert results[2]['text'] == 'text 1'
+
+
+def test_single_image_wrapper(monkeypatch):
+    monkeypatch.setattr(ocr_processor, '_load_vision', lambda: None)
+    monkeypatch.setattr(ocr_processor, '_annotate_rest', fake_rest([]))
+
+    assert ocr_processor.extract_text_from_image(TEST_IMAGE, 'key') == {
+        'success': True,
+        'text': 'text 0',
+        'error': ''
+    }
+
+
+def test_rate_limited_batch_pauses_and_retries(monkeypatch):
+    calls = []
+    pauses = []
+    annotate = fake_rest(calls)
+
+    def rate_limited_once(contents, api_key):
+        if not calls:
+            calls.append('429')
+            raise ocr_processor._RateLimited(2)
+        return annotate(contents, api_key)
+
+    monkeypatch.setattr(ocr_processor, '_load_vision', lambda: None)
+    monkeypatch.setattr(ocr_processor, '_annotate_rest', rate_limited_once)
+    monkeypatch.setattr(ocr_processor._rate_limit_gate, 'pause', pauses.append)
+
+    result = ocr_processor.extract_text_from_image(TEST_IMAGE, 'key')
+
+    assert calls == ['429', 1]
+    assert pauses == [2]
+    assert result['text'] == 'text 0'
+
+
+def test_rest_429_with_retry_after_reaches_the_gate(monkeypatch):
+    hits = []
+
+    class VisionHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers['Content-Length']))
+            hits.append((self.path, self.headers['X-Goog-Api-Key']))
+            if len(hits) == 1:
+                self.send_response(429)
+                self.send_header('Retry-After', '7')
+                body = b'{}'
+            else:
+                self.send_response(200)
+                body = b'{"responses": [{"textAnnotations": [{"description": "Tylenol"}]}]}'
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), VisionHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    # The production retry policy, mounted for plain http so the local server can stand in for Vision
+    session = requests.Session()
+    session.mount('http://', HTTPAdapter(max_retries=ocr_processor.RETRY_POLICY))
+    pauses = []
+    monkeypatch.setattr(ocr_processor, '_load_vision', lambda: None)
+    monkeypatch.setattr(ocr_processor, '_session', session)
+    monkeypatch.setattr(ocr_processor, 'VISION_REST_URL', f'http://127.0.0.1:{server.server_port}/v1/images:annotate')
+    monkeypatch.setattr(ocr_processor._rate_limit_gate, 'pause', pauses.append)
+
+    try:
+        result = ocr_processor.extract_text_from_image(TEST_IMAGE, 'key')
+    finally:
+        server.shutdown()
+        session.close()
+
+    # urllib3 must not sleep on Retry-After and resend by itself
+    assert len(hits) == 2
+    assert pauses == [7]
+    # The key travels in a header, never in the (logged) URL
+    assert all(api_key == 'key' and 'key=' not in path for path, api_key in hits)
+    assert result['text'] == 'Tylenol'
+
+
+class FakeVisionClient:
+    """Stands in for ImageAnnotatorClient; the first `failures` calls raise"""
+
+    def __init__(self, failures=()):
+        self.failures = list(failures)
+        self.calls = []
+
+    def batch_annotate_images(self, requests, **kwargs):
+        self.calls.append(kwargs)
+        if self.failures:
+            raise self.failures.pop(0)
+        return SimpleNamespace(responses=[
+            SimpleNamespace(error=SimpleNamespace(message=''),
+                            text_annotations=[SimpleNamespace(description=f'grpc {i}')])
+            for i in range(len(requests))
+        ])
+
+
+def use_fake_grpc(monkeypatch, client):
+    fake_vision = SimpleNamespace(Feature=SimpleNamespace(Type=SimpleNamespace(TEXT_DETECTION=1)))
+    monkeypatch.setattr(ocr_processor, '_load_vision', lambda: fake_vision)
+    monkeypatch.setattr(ocr_processor, '_get_vision_client', lambda api_key: client)
+    monkeypatch.setattr(ocr_processor, '_grpc_retry', lambda: 'bounded retry')
+
+
+def test_grpc_calls_are_bounded_by_timeout_and_retry(monkeypatch):
+    client = FakeVisionClient()
+    use_fake_grpc(monkeypatch, client)
+
+    results = ocr_processor.extract_text_from_images([TEST_IMAGE, TEST_IMAGE], 'key')
+
+    assert [result['text'] for result in results] == ['grpc 0', 'grpc 1']
+    assert client.calls == [{'retry': 'bounded retry', 'timeout': ocr_processor.REQUEST_TIMEOUT[1]}]
+
+
+def test_grpc_resource_exhausted_pauses_the_gate(monkeypatch):
+    exceptions = pytest.importorskip('google.api_core.exceptions')
+    client = FakeVisionClient(failures=[exceptions.ResourceExhausted('quota')])
+    pauses = []
+    use_fake_grpc(monkeypatch, client)
+    monkeypatch.setattr(ocr_processor._rate_limit_gate, 'pause', pauses.append)
+
+    result = ocr_processor.extract_text_from_image(TEST_IMAGE, 'key')
+
+    assert len(client.calls) == 2
+    assert pauses == [ocr_processor.DEFAULT_RETRY_AFTER]
+    assert result['text'] == 'grpc 0'
+
+
+def test_grpc_errors_that_only_look_like_rate_limits_are_not_retried(monkeypatch):
+    pytest.importorskip('google.api_core.exceptions')
+
+    class ResourceExhausted(Exception):
+        pass
+
+    client = FakeVisionClient(failures=[ResourceExhausted('unrelated')])
+    use_fake_grpc(monkeypatch, client)
+
+    result = ocr_processor.extract_text_from_image(TEST_IMAGE, 'key')
+
+    assert len(client.calls) == 1
+    assert result == {'success': False, 'text': '', 'error': 'Error: unrelated'}
+
+
+def test_image_bytes_are_accepted_without_a_file(monkeypatch):
+    calls = []
+    monkeypatch.setattr(ocr_processor, '_load_vision', lambda: None)
+    monkeypatch.setattr(ocr_processor, '_annotate_rest', fake_rest(calls))
+    with open(TEST_IMAGE, 'rb') as image_file:
+        content = image_file.read()
+
+    results = ocr_processor.extract_text_from_images([content, TEST_IMAGE], 'key')
+
+    assert calls == [2]
+    assert [result['text'] for result in results] == ['text 0', 'text 1']
+
+
+def test_repeat_image_is_served_from_disk_cache(monkeypatch, tmp_path):
+    calls = []
+    monkeypatch.setattr(ocr_processor, 'OCR_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(ocr_processor, '_load_vision', lambda: None)
+    monkeypatch.setattr(ocr_processor, '_annotate_rest', fake_rest(calls))
+
+    first = ocr_processor.extract_text_from_image(TEST_IMAGE, 'key')
+    second = ocr_processor.extract_text_from_images([TEST_IMAGE, b'not an image'], 'key')
+
+    assert calls == [1, 1]
+    assert second[0] == first
+    assert len(list(tmp_path.glob('*.json'))) == 2
+
+
+def test_disk_cache_evicts_least_recently_used(monkeypatch, tmp_path):
+    monkeypatch.setattr(ocr_processor, 'OCR_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(ocr_processor, 'OCR_CACHE_MAX_ENTRIES', 2)
+    monkeypatch.setattr(ocr_processor, 'OCR_CACHE_EVICT_EVERY', 1)
+    ocr_processor._cache_put('a', ocr_processor._text_result('a'))
+    ocr_processor._cache_put('b', ocr_processor._text_result('b'))
+    os.utime(tmp_path / 'a.json', (1000, 1000))
+    os.utime(tmp_path / 'b.json', (2000, 2000))
+
+    assert ocr_processor._cache_get('a')['text'] == 'a'
+    ocr_processor._cache_put('c', ocr_processor._text_result('c'))
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['a.json', 'c.json']
+
+
+def test_disk_cache_scans_for_eviction_once_per_interval(monkeypatch, tmp_path):
+    scans = []
+    monkeypatch.setattr(ocr_processor, 'OCR_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(ocr_processor, 'OCR_CACHE_EVICT_EVERY', 3)
+    monkeypatch.setattr(ocr_processor, '_cache_writes', ocr_processor.count())
+    monkeypatch.setattr(ocr_processor, '_cache_evict', scans.append)
+
+    for key in 'abcdefg':
+        ocr_processor._cache_put(key, ocr_processor._text_result(key))
+
+    assert len(scans) == 3
+
+
+def test_prepare_upload_downscales_to_max_side():
+    import cv2
+    import numpy as np
+    with open(TEST_IMAGE, 'rb') as image_file:
+        content = image_file.read()
+
+    prepared = ocr_processor._prepare_upload(content, max_side=400)
+    image = cv2.imdecode(np.frombuffer(prepared, np.uint8), cv2.IMREAD_COLOR)
+
+    assert max(image.shape[:2]) == 400
+    assert len(prepared) < len(content)
+
+
+def test_prepare_upload_flattens_transparent_png_onto_white():
+    import cv2
+    import numpy as np
+    # Black text on a fully transparent background
+    image = np.zeros((600, 2000, 4), np.uint8)
+    cv2.putText(image, 'TYLENOL', (50, 400), cv2.FONT_HERSHEY_SIMPLEX, 10, (0, 0, 0, 255), 25)
+    ok, buffer = cv2.imencode('.png', image)
+
+    prepared = ocr_processor._prepare_upload(buffer.tobytes(), max_side=1000)
+    flattened = cv2.imdecode(np.frombuffer(prepared, np.uint8), cv2.IMREAD_COLOR)
+
+    assert ok
+    assert flattened[0, 0].min() > 240
+    assert flattened.min() < 15
+
+
+def with_exif_orientation(jpeg, orientation):
+    """Insert an APP1 Exif segment holding only an Orientation tag after the SOI marker"""
+    tiff = b'MM\x00\x2a\x00\x00\x00\x08' + b'\x00\x01' + b'\x01\x12\x00\x03\x00\x00\x00\x01' \
+        + orientation.to_bytes(2, 'big') + b'\x00\x00' + b'\x00\x00\x00\x00'
+    segment = b'Exif\x00\x00' + tiff
+    return jpeg[:2] + b'\xff\xe1' + (len(segment) + 2).to_bytes(2, 'big') + segment + jpeg[2:]
+
+
+def test_prepare_upload_applies_exif_orientation():
+    import cv2
+    import numpy as np
+    ok, buffer = cv2.imencode('.jpg', np.full((400, 1200, 3), 200, np.uint8))
+    rotated = with_exif_orientation(buffer.tobytes(), 6)
+
+    prepared = ocr_processor._prepare_upload(rotated, max_side=600, jpeg_quality=30)
+    image = cv2.imdecode(np.frombuffer(prepared, np.uint8), cv2.IMREAD_COLOR)
+
+    assert ok
+    assert ocr_processor._jpeg_orientation(rotated) == 6
+    assert ocr_processor._jpeg_orientation(buffer.tobytes()) == 1
+    assert image.shape[:2] == (600, 200)
+
+
+def test_rate_limit_gate_zero_means_unthrottled():
+    import time
+    gate = ocr_processor._RateLimitGate(0)
+
+    start = time.monotonic()
+    for _ in range(100):
+        gate.wait()
+
+    assert time.monotonic() - start < 0.5
+
+
+def test_batch_outputs_keep_the_image_extension(monkeypatch, tmp_path):
+    import shutil
+    images = tmp_path / 'images'
+    images.mkdir()
+    shutil.copy(TEST_IMAGE, images / 'label.jpg')
+    shutil.copy(TEST_IMAGE, images / 'label.png')
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(ocr_processor, '_load_vision', lambda: None)
+    monkeypatch.setattr(ocr_processor, '_annotate_rest', fake_rest([]))
+
+    ocr_processor.run_batch(str(images), 'key')
+
+    assert (tmp_path / 'label.jpg_extracted_text.txt').read_text() == 'text 0'
+    assert (tmp_path / 'label.png_extracted_text.txt').read_text() == 'text 1'
@@ -0,0 +1,95 @@
+"""
+Unit tests for formatting store lookups into the /product response
+Run offline: operates on sample SerpAPI responses only
+"""
+
+import sys
+import os
+# Add parent directory to path to allow imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ui.app import app, format_product_details
+
+
+def test_stores_are_split_into_nearby_and_online():
+    stores = [
+        {'name': 'Walmart', 'price': '$6.97', 'details_and_offers': ['In stock NEARBY']},
+        {'name': 'Target', 'tag': 'Nearby'},
+        {'name': 'Amazon', 'price': '$7.49', 'total': '$9.49', 'details_and_offers': ['Free delivery']},
+        {'name': 'eBay'},
+    ]
+
+    body, status = format_product_details({'product_results': {'title': 'Tylenol', 'stores': stores}})
+
+    assert status == 200
+    assert [store['name'] for store in body['nearby_stores']] == ['Walmart', 'Target']
+    assert [store['name'] for store in body['online_stores']] == ['Amazon', 'eBay']
+    assert body['online_stores'][0]['total'] == '$9.49'
+    assert body['online_stores'][1]['total'] == 'N/A'
+    assert body['total_stores'] == 4
+
+
+def test_errors_and_missing_product_data():
+    assert format_product_details({'error': 'Invalid token'}) == ({'error': 'Invalid token'}, 500)
+    assert format_product_details({}) == ({'error': 'No product data found'}, 404)
+
+
+def test_invalid_page_token_is_rejected_before_lookup(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError('SerpAPI should not be called')
+
+    monkeypatch.setattr('ui.app.get_product_locations', fail)
+    client = app.test_client()
+
+    for token in ('abc', 'not a token' * 5, '<script>alert(1)</script>' * 2):
+        response = client.get(f'/product/{token}')
+        assert response.status_code == 400
+        assert response.get_json() == {'error': 'Invalid product token'}
+
+
+def test_matching_etag_returns_304_without_lookup(monkeypatch):
+    calls = []
+
+    def fake_locations(page_token, **kwargs):
+        calls.append(page_token)
+        return {'product_results': {'title': 'Tylenol', 'stores': [{'name': 'Walmart'}]}}
+
+    monkeypatch.setattr('ui.app.get_product_locations', fake_locations)
+    client = app.test_client()
+    url = '/product/' + 'A' * 40
+
+    first = client.get(url)
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+
+    second = client.get(url, headers={'If-None-Match': etag})
+    assert second.status_code == 304
+    assert second.data == b''
+    assert calls == ['A' * 40]
+
+
+def test_no_cache_is_ignored_unless_allowed(monkeypatch):
+    refreshes = []
+
+    def fake_locations(page_token, force_refresh=False, **kwargs):
+        refreshes.append(force_refresh)
+        return {'product_results': {'title': 'Tylenol', 'stores': []}}
+
+    monkeypatch.setattr('ui.app.get_product_locations', fake_locations)
+    client = app.test_client()
+    url = '/product/' + 'C' * 40 + '?no_cache=1'
+
+    client.get(url)
+    monkeypatch.setattr('ui.app.ALLOW_CACHE_BYPASS', True)
+    client.get(url)
+
+    assert refreshes == [False, True]
+
+
+def test_json_provider_matches_flask_argument_handling():
+    from flask import jsonify
+
+    with app.app_context():
+        assert jsonify(1, 2).get_json() == [1, 2]
+        assert jsonify(name='Walmart').get_json() == {'name': 'Walmart'}
+        assert app.json.dumps({'b': 1, 'a': 2}, indent=2) == '{\n  "a": 2,\n  "b": 1\n}'
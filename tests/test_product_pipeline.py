@@ -2,21 +2,28 @@
 Test script for two-step product lookup pipeline:
 Step 1: Generic product search (get product IDs)
 Step 2: Product-specific location lookup (using product ID)
+        for the top 3 products, issued concurrently
 
 This validates that SerpAPI returns product IDs and that those IDs
 can be used to query the Google Product API for location data.
 """
 
+import asyncio
 import sys
 import os
 # Add parent directory to path to allow imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from backend.api.api_retrieval import get_product_results, get_product_locations
+from backend.api.async_client import aget_product_results, aget_product_locations
 import json
 
 def test_pipeline():
     """Test the full two-step product lookup pipeline"""
+    asyncio.run(run_pipeline())
+
+
+async def run_pipeline():
+    """Run both pipeline steps, looking up store locations for the top products concurrently"""
 
     print("="*60)
     print("STEP 1: Generic Product Search")
@@ -29,7 +36,7 @@ def test_pipeline():
     print(f"\nSearching for: '{query}'")
     print(f"Location: {user_location}\n")
 
-    results = get_product_results(query=query, user_location=user_location)
+    results = await aget_product_results(query=query, user_location=user_location)
 
     if not results or "shopping_results" not in results:
         print("ERROR: No shopping results returned!")
@@ -72,19 +79,36 @@ def test_pipeline():
     print("STEP 2: Product Location Lookup")
     print("="*60)
 
-    # Step 2: Try to get location data for the first product
-    page_token = first_product.get("immersive_product_page_token")
+    # Step 2: Look up location data for the top 3 products at once
+    products = [p for p in shopping_results[:3] if p.get("immersive_product_page_token")]
 
-    if not page_token:
-        print("\n❌ PIPELINE BLOCKED: First product has no immersive_product_page_token!")
+    if not products:
+        print("\n❌ PIPELINE BLOCKED: No top product has an immersive_product_page_token!")
         return
 
-    print(f"\nQuerying Google Immersive Product API")
-    print(f"Product: {first_product.get('title')}")
-    print(f"Using page_token: {page_token[:50]}...\n")
+    print(f"\nQuerying Google Immersive Product API for {len(products)} products")
+    for product in products:
+        print(f"Product: {product.get('title')}")
+        print(f"Using page_token: {product['immersive_product_page_token'][:50]}...\n")
+
+    locations = await asyncio.gather(*(
+        aget_product_locations(page_token=product["immersive_product_page_token"])
+        for product in products
+    ))
+
+    for product, location_data in zip(products, locations):
+        print("\n" + "="*60)
+        print(f"LOCATION DATA: {product.get('title')}")
+        print("="*60)
+        analyze_location_data(location_data)
+
+    print("\n" + "="*60)
+    print("PIPELINE TEST COMPLETE")
+    print("="*60)
 
-    location_data = get_product_locations(page_token=page_token)
 
+def analyze_location_data(location_data):
+    """Print a location lookup result and split its stores into nearby and online only"""
     if "error" in location_data:
         print(f"❌ ERROR: {location_data['error']}")
         return
@@ -157,10 +181,6 @@ def test_pipeline():
     else:
         print("❌ No store location data found in response")
 
-    print("\n" + "="*60)
-    print("PIPELINE TEST COMPLETE")
-    print("="*60)
-
 
 if __name__ == "__main__":
     test_pipeline()
@@ -0,0 +1,170 @@
+"""
+Unit tests for the in-process SerpAPI response cache
+Run offline: the cached functions are local fakes, no API calls are made
+"""
+
+import sys
+import os
+# Add parent directory to path to allow imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cachetools.keys import hashkey
+from backend.api.cache import ttl_cached, clear_cache
+
+
+def setup_function():
+    clear_cache()
+
+
+def test_repeat_call_is_served_from_cache():
+    calls = []
+
+    @ttl_cached(lambda query, user_location=None: hashkey("test_shopping", query, user_location))
+    def search(query, user_location=None):
+        calls.append((query, user_location))
+        return {"shopping_results": [{"title": query}]}
+
+    first = search("coffee maker", user_location="Fayetteville")
+    second = search("coffee maker", user_location="Fayetteville")
+
+    assert first == second
+    assert len(calls) == 1
+
+
+def test_location_is_part_of_the_key():
+    calls = []
+
+    @ttl_cached(lambda query, user_location=None: hashkey("test_shopping", query, user_location))
+    def search(query, user_location=None):
+        calls.append((query, user_location))
+        return {"shopping_results": []}
+
+    search("coffee maker")
+    search("coffee maker", user_location="Fayetteville")
+
+    assert len(calls) == 2
+
+
+def test_errors_and_empty_results_are_not_cached():
+    responses = [{"error": "rate limited"}, {}, {"product_results": {"title": "Tylenol"}}]
+    calls = []
+
+    @ttl_cached(lambda page_token: hashkey("test_immersive", page_token))
+    def lookup(page_token):
+        calls.append(page_token)
+        return responses[len(calls) - 1]
+
+    assert lookup("token") == {"error": "rate limited"}
+    assert lookup("token") == {}
+    assert lookup("token") == {"product_results": {"title": "Tylenol"}}
+    assert lookup("token") == {"product_results": {"title": "Tylenol"}}
+    assert len(calls) == 3
+
+
+def test_semantic_embedding_ignores_case_spacing_and_punctuation():
+    from backend.api.semantic_cache import embed, cosine_distance
+
+    assert cosine_distance(embed("Coffee Maker"), embed("coffeemaker")) < 1e-9
+    assert cosine_distance(embed("coffee-maker"), embed("coffee maker")) < 1e-9
+
+
+def test_semantic_embedding_separates_different_products():
+    from backend.api.semantic_cache import embed, cosine_distance
+    from backend.config import SERPAPI_SEMANTIC_CACHE_DISTANCE
+
+    assert cosine_distance(embed("tylenol 500mg"), embed("tylenol 325mg")) > SERPAPI_SEMANTIC_CACHE_DISTANCE
+    assert cosine_distance(embed("advil"), embed("aleve")) > SERPAPI_SEMANTIC_CACHE_DISTANCE
+
+
+def test_semantic_cache_creates_its_directory(monkeypatch, tmp_path):
+    import backend.api.semantic_cache as semantic_cache
+
+    monkeypatch.setattr(semantic_cache, "SERPAPI_SEMANTIC_CACHE_PATH", str(tmp_path / "cache" / "semantic.sqlite"))
+    semantic_cache.store("ns", "coffee maker", {"shopping_results": [{"title": "Mr. Coffee"}]})
+
+    assert semantic_cache.lookup("ns", "coffeemaker") == {"shopping_results": [{"title": "Mr. Coffee"}]}
+
+
+def test_semantic_cache_does_not_merge_product_sizes(monkeypatch, tmp_path):
+    import backend.api.semantic_cache as semantic_cache
+
+    monkeypatch.setattr(semantic_cache, "SERPAPI_SEMANTIC_CACHE_PATH", str(tmp_path / "semantic.sqlite"))
+    stored = "Tylenol Extra Strength 500mg Caplets 100 count"
+    semantic_cache.store("ns", stored, {"shopping_results": [{"title": "Tylenol 100ct"}]})
+
+    # Close enough to match on trigrams alone, but a different SKU
+    assert semantic_cache.cosine_distance(
+        semantic_cache.embed(stored), semantic_cache.embed("Tylenol Extra Strength 500mg Caplets 24 count")
+    ) < semantic_cache.SERPAPI_SEMANTIC_CACHE_DISTANCE
+    assert semantic_cache.lookup("ns", "Tylenol Extra Strength 500mg Caplets 24 count") is None
+    assert semantic_cache.lookup("ns", "tylenol extra-strength 500mg caplets, 100 count") is not None
+
+
+def test_concurrent_identical_lookups_share_one_request():
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    calls = []
+    release = threading.Event()
+
+    # Empty responses are never cached, so only coalescing keeps this at one call
+    @ttl_cached(lambda query: hashkey("test_single_flight", query))
+    def search(query):
+        calls.append(query)
+        release.wait(5)
+        return {}
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(search, "tylenol") for _ in range(4)]
+        time.sleep(0.2)
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert calls == ["tylenol"]
+    assert results == [{}, {}, {}, {}]
+
+
+def test_stuck_in_flight_lookup_falls_back_to_own_request(monkeypatch):
+    import threading
+    import time
+    import backend.api.cache as cache
+
+    calls = []
+    release = threading.Event()
+    monkeypatch.setattr(cache, "IN_FLIGHT_WAIT", 0.2)
+
+    @ttl_cached(lambda query: hashkey("test_stuck_leader", query))
+    def search(query):
+        calls.append(query)
+        if len(calls) == 1:
+            release.wait(5)
+        return {"shopping_results": [len(calls)]}
+
+    leader = threading.Thread(target=search, args=("tylenol",))
+    leader.start()
+    time.sleep(0.05)
+
+    assert search("tylenol") == {"shopping_results": [2]}
+    release.set()
+    leader.join()
+    assert len(calls) == 2
+
+
+def test_callers_get_their_own_copy_of_cached_responses():
+    @ttl_cached(lambda query: hashkey("test_copy", query))
+    def search(query):
+        return {"shopping_results": ["Tylenol"]}
+
+    search("tylenol")["extra"] = "mutated"
+
+    assert search("tylenol") == {"shopping_results": ["Tylenol"]}
+
+
+def test_read_timeouts_are_not_retried():
+    import pytest
+    from urllib3.exceptions import MaxRetryError, ReadTimeoutError
+    from backend.api.api_retrieval import RETRY_POLICY
+
+    with pytest.raises(MaxRetryError):
+        RETRY_POLICY.increment("GET", "/search.json", error=ReadTimeoutError(None, "/search.json", "timed out"))
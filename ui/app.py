@@ -3,12 +3,19 @@ Flask web application for AI-Powered Inventory Locator System
 Allows users to upload product images, search for products, and find nearby availability
 """
 
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, render_template, request, jsonify
+from flask.json.provider import DefaultJSONProvider
+import asyncio
+import hashlib
+import orjson
 import os
+import re
+import secrets
 import sys
+import threading
+from cachetools import TTLCache
 from pathlib import Path
 from werkzeug.utils import secure_filename
-import uuid
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -18,10 +25,51 @@ load_dotenv()
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from models.ocr_processor import extract_text_from_image
-from backend.api.api_retrieval import get_product_results, get_product_locations
-from backend.config import SERPAPI_KEY
+from backend.api.api_retrieval import get_product_locations
+from backend.api.async_client import aget_product_locations, aget_product_results
+from backend.config import SERPAPI_KEY, configure_logging
+
+configure_logging()
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson
+    Serializes jsonify responses (store lists in particular) several times
+    faster than the stdlib json module and writes the bytes straight into the response
+    """
+
+    def _options(self, indent=False):
+        options = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        # Options orjson cannot express (indent, separators, cls, ...) go to the stdlib provider
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Same argument handling as jsonify: one value, several as a list, or keywords as a dict
+        if args and kwargs:
+            raise TypeError('app.json.response() takes either args or kwargs, not both')
+        obj = args[0] if len(args) == 1 else (args or kwargs or None)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=self.default, option=self._options(indent) | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 
 # Configuration from environment variables
 FLASK_ENV = os.getenv('FLASK_ENV', 'development')
@@ -30,8 +78,10 @@ app.secret_key = os.getenv('FLASK_SECRET_KEY', 'dev-secret-key-change-in-product
 
 # File upload configuration
 UPLOAD_FOLDER = Path(os.getenv('UPLOAD_FOLDER', 'ui/uploads'))
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp'}
+ALLOWED_EXTENSIONS = frozenset({'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp'})
 MAX_FILE_SIZE = int(os.getenv('MAX_UPLOAD_SIZE', 10 * 1024 * 1024))  # Default 10MB
+# Uploads are OCR'd from memory; set to true to also keep a copy in UPLOAD_FOLDER
+KEEP_UPLOADS = os.getenv('KEEP_UPLOADS', 'False').lower() == 'true'
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
@@ -43,10 +93,43 @@ UPLOAD_FOLDER.mkdir(parents=True, exist_ok=True)
 GOOGLE_VISION_API_KEY = os.getenv('GOOGLE_CLOUD_API_KEY')
 USER_LOCATION = os.getenv('USER_LOCATION', 'Fayetteville, Arkansas, United States')
 
+# Store details for the top N search results (at most 5) are fetched
+# concurrently during /search and returned with the results, saving the
+# /product round trip. Each one is a paid SerpAPI call, so this is off by default.
+SEARCH_PREFETCH_COUNT = min(int(os.getenv('SEARCH_PREFETCH_COUNT', 0)), 5)
+
+# Honour ?no_cache=1 on /search and /product. Off by default: any client could
+# otherwise force paid SerpAPI calls (up to 1 + SEARCH_PREFETCH_COUNT per /search)
+ALLOW_CACHE_BYPASS = os.getenv('ALLOW_CACHE_BYPASS', 'False').lower() == 'true'
+
+# Immersive product page tokens are long base64 strings; anything else is
+# rejected before it costs a SerpAPI call
+PAGE_TOKEN_PATTERN = re.compile(r'[A-Za-z0-9+/=_-]{32,}')
+
+# ETags of recent /product responses by page token; a browser revalidating
+# with a matching If-None-Match gets a 304 without another lookup
+PRODUCT_ETAG_TTL = int(os.getenv('PRODUCT_ETAG_TTL', 300))  # Seconds
+_product_etags = TTLCache(maxsize=1024, ttl=PRODUCT_ETAG_TTL)
+_product_etags_lock = threading.Lock()
+
 
 def allowed_file(filename):
     """Check if file extension is allowed"""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    _, dot, extension = filename.rpartition('.')
+    return bool(dot) and extension.lower() in ALLOWED_EXTENSIONS
+
+
+def valid_page_token(page_token):
+    """Check that a page token could have come from a SerpAPI search result"""
+    return PAGE_TOKEN_PATTERN.fullmatch(page_token) is not None
+
+
+def fresh_results_requested():
+    """
+    Check for ?no_cache=1, which skips cached SerpAPI responses (ours and SerpAPI's)
+    Ignored unless ALLOW_CACHE_BYPASS is set, since every bypass is a paid SerpAPI call
+    """
+    return ALLOW_CACHE_BYPASS and request.args.get('no_cache', '').lower() in ('1', 'true')
 
 
 @app.route('/')
@@ -74,36 +157,32 @@ def upload_image():
     if not allowed_file(file.filename):
         return jsonify({'error': f'Invalid file type. Allowed types: {", ".join(ALLOWED_EXTENSIONS)}'}), 400
 
+    # Check if Google Vision API key is available
+    if not GOOGLE_VISION_API_KEY:
+        return jsonify({
+            'error': 'Google Vision API key not configured. Please set GOOGLE_CLOUD_API_KEY environment variable.'
+        }), 500
+
     try:
-        # Save uploaded file with unique name
-        filename = secure_filename(file.filename)
-        unique_filename = f"{uuid.uuid4()}_{filename}"
-        filepath = app.config['UPLOAD_FOLDER'] / unique_filename
-        file.save(filepath)
-
-        # Check if Google Vision API key is available
-        if not GOOGLE_VISION_API_KEY:
-            return jsonify({
-                'error': 'Google Vision API key not configured. Please set GOOGLE_CLOUD_API_KEY environment variable.'
-            }), 500
+        # OCR straight from the request body instead of a saved file
+        image_data = file.read()
+
+        if KEEP_UPLOADS:
+            # Keep a copy with a unique name for debugging
+            filename = secure_filename(file.filename)
+            (app.config['UPLOAD_FOLDER'] / f"{secrets.token_hex(8)}_{filename}").write_bytes(image_data)
 
         # Extract text from image using OCR
-        ocr_result = extract_text_from_image(str(filepath), GOOGLE_VISION_API_KEY)
+        ocr_result = extract_text_from_image(image_data, GOOGLE_VISION_API_KEY)
 
         if not ocr_result['success']:
-            # Clean up uploaded file
-            filepath.unlink(missing_ok=True)
             return jsonify({'error': f"OCR failed: {ocr_result['error']}"}), 500
 
         extracted_text = ocr_result['text'].strip()
 
         if not extracted_text:
-            filepath.unlink(missing_ok=True)
             return jsonify({'error': 'No text detected in image. Please try a clearer image.'}), 400
 
-        # Store filepath in session for later cleanup
-        session['last_upload'] = str(filepath)
-
         return jsonify({
             'success': True,
             'extracted_text': extracted_text,
@@ -111,14 +190,11 @@ def upload_image():
         })
 
     except Exception as e:
-        # Clean up on error
-        if 'filepath' in locals() and filepath.exists():
-            filepath.unlink(missing_ok=True)
         return jsonify({'error': f'Error processing image: {str(e)}'}), 500
 
 
 @app.route('/search', methods=['POST'])
-def search_products():
+async def search_products():
     """
     Search for products based on extracted text or manual query
     Returns list of product options for user confirmation
@@ -126,13 +202,14 @@ def search_products():
 
     data = request.get_json()
     query = data.get('query', '').strip()
+    force_refresh = fresh_results_requested()
 
     if not query:
         return jsonify({'error': 'Search query is required'}), 400
 
     try:
         # Search for products using SerpAPI
-        results = get_product_results(query=query, user_location=USER_LOCATION)
+        results = await aget_product_results(query=query, user_location=USER_LOCATION, force_refresh=force_refresh)
 
         if not results or 'shopping_results' not in results:
             return jsonify({
@@ -155,6 +232,20 @@ def search_products():
                 'product_id': product.get('product_id', ''),
             })
 
+        # Fetch store details for the top results in parallel; the frontend
+        # shows a product's 'details' directly instead of calling /product
+        prefetched = [product for product in products[:SEARCH_PREFETCH_COUNT] if product['page_token']]
+        if prefetched:
+            lookups = await asyncio.gather(
+                *(aget_product_locations(product['page_token'], force_refresh=force_refresh) for product in prefetched),
+                return_exceptions=True
+            )
+            for product, location_data in zip(prefetched, lookups):
+                if isinstance(location_data, dict):
+                    details, status = format_product_details(location_data)
+                    if status == 200:
+                        product['details'] = details
+
         return jsonify({
             'success': True,
             'products': products,
@@ -172,73 +263,106 @@ def get_product_details(page_token):
     Uses the immersive product page token from search results
     """
 
+    if not valid_page_token(page_token):
+        return jsonify({'error': 'Invalid product token'}), 400
+
+    force_refresh = fresh_results_requested()
+    if not force_refresh:
+        with _product_etags_lock:
+            etag = _product_etags.get(page_token)
+        if etag and request.if_none_match.contains(etag):
+            response = app.response_class(status=304)
+            response.set_etag(etag)
+            response.cache_control.no_cache = True
+            return response
+
     try:
         # Get detailed product data
-        location_data = get_product_locations(page_token)
-
-        if 'error' in location_data:
-            return jsonify({'error': location_data['error']}), 500
-
-        # Parse product results
-        if 'product_results' not in location_data:
-            return jsonify({'error': 'No product data found'}), 404
-
-        product_results = location_data['product_results']
-
-        # Extract store information
-        stores_data = product_results.get('stores', [])
-        nearby_stores = []
-        online_stores = []
-
-        for store in stores_data:
-            store_info = {
-                'name': store.get('name', 'Unknown Store'),
-                'price': store.get('price', 'N/A'),
-                'extracted_price': store.get('extracted_price'),
-                'link': store.get('link', ''),
-                'rating': store.get('rating'),
-                'reviews': store.get('reviews'),
-                'logo': store.get('logo', ''),
-                'details': store.get('details_and_offers', []),
-                'tag': store.get('tag', ''),
-                'shipping': store.get('shipping', ''),
-                'total': store.get('total', store.get('price', 'N/A'))
-            }
-
-            # Check if available nearby
-            is_nearby = False
-            for detail in store.get('details_and_offers', []):
-                if 'nearby' in detail.lower():
-                    is_nearby = True
-                    break
-
-            if is_nearby or store.get('tag', '').lower() == 'nearby':
-                nearby_stores.append(store_info)
-            else:
-                online_stores.append(store_info)
-
-        # Product information
-        product_info = {
-            'title': product_results.get('title', 'Unknown Product'),
-            'brand': product_results.get('brand', ''),
-            'rating': product_results.get('rating'),
-            'reviews': product_results.get('reviews'),
-            'price_range': product_results.get('price_range', ''),
-            'thumbnails': product_results.get('thumbnails', [])[:5],  # Limit to 5 images
-        }
-
-        return jsonify({
-            'success': True,
-            'product': product_info,
-            'nearby_stores': nearby_stores,
-            'online_stores': online_stores,
-            'total_stores': len(stores_data)
-        })
+        location_data = get_product_locations(page_token, force_refresh=force_refresh)
+        body, status = format_product_details(location_data)
+        response = jsonify(body)
+        response.status_code = status
+        if status == 200:
+            etag = hashlib.blake2b(response.get_data(), digest_size=16).hexdigest()
+            with _product_etags_lock:
+                _product_etags[page_token] = etag
+            response.set_etag(etag)
+            # Let browsers keep the body but revalidate it on every use
+            response.cache_control.no_cache = True
+            response.make_conditional(request)
+        return response
 
     except Exception as e:
         return jsonify({'error': f'Failed to get product details: {str(e)}'}), 500
 
 
+def format_product_details(location_data):
+    """
+    Build the product details response from a google_immersive_product lookup
+    Shared by /product and the /search prefetch
+
+    Args:
+        location_data: Result of get_product_locations
+
+    Returns:
+        Tuple of (response body dict, HTTP status code)
+    """
+    if 'error' in location_data:
+        return {'error': location_data['error']}, 500
+
+    # Parse product results
+    if 'product_results' not in location_data:
+        return {'error': 'No product data found'}, 404
+
+    product_results = location_data['product_results']
+
+    # Extract store information
+    stores_data = product_results.get('stores', [])
+    nearby_stores = []
+    online_stores = []
+
+    for store in stores_data:
+        details = store.get('details_and_offers', [])
+        tag = store.get('tag', '')
+        price = store.get('price', 'N/A')
+
+        # Available nearby if tagged so or any offer mentions it; the offers are
+        # joined so each store needs one casefold and one scan
+        is_nearby = tag.casefold() == 'nearby' or 'nearby' in '\n'.join(details).casefold()
+
+        (nearby_stores if is_nearby else online_stores).append({
+            'name': store.get('name', 'Unknown Store'),
+            'price': price,
+            'extracted_price': store.get('extracted_price'),
+            'link': store.get('link', ''),
+            'rating': store.get('rating'),
+            'reviews': store.get('reviews'),
+            'logo': store.get('logo', ''),
+            'details': details,
+            'tag': tag,
+            'shipping': store.get('shipping', ''),
+            'total': store.get('total', price)
+        })
+
+    # Product information
+    product_info = {
+        'title': product_results.get('title', 'Unknown Product'),
+        'brand': product_results.get('brand', ''),
+        'rating': product_results.get('rating'),
+        'reviews': product_results.get('reviews'),
+        'price_range': product_results.get('price_range', ''),
+        'thumbnails': product_results.get('thumbnails', [])[:5],  # Limit to 5 images
+    }
+
+    return {
+        'success': True,
+        'product': product_info,
+        'nearby_stores': nearby_stores,
+        'online_stores': online_stores,
+        'total_stores': len(stores_data)
+    }, 200
+
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""